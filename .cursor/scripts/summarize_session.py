@@ -1,9 +1,12 @@
 import sys
 import re
-import json
+import select
 import datetime
+import io
 import subprocess
-from collections import Counter
+import time
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
 import os
 
 # Set up paths
@@ -11,91 +14,159 @@ SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 OUTPUT_DIR = SCRIPT_DIR
 BUGFIXES_FILE = os.path.join(OUTPUT_DIR, "bugfixes.md")
 SUMMARY_FILE = os.path.join(OUTPUT_DIR, "last_session_summary.md")
+STRUCTURE_FILE = os.path.join(OUTPUT_DIR, "file_structure.md")
+# Seconds for which file_structure.md is reused instead of listing the tree again
+STRUCTURE_MAX_AGE = 600
 
-def extract_error_context(context, error_match, window=3):
+# Patterns used to analyze the conversation, matched line by line
+ERR_KEYWORDS_RE = re.compile(r"error|exception|failed|failure", re.I)
+FRUST_RE = re.compile(r"([A-Z !]{4,}|(?:damn|shit|fuck|crap))[^\n.]*")
+# All solution keywords are found in a single pass and dispatched by group name.
+# The alternation is zero-width, so keywords of different categories may overlap.
+SOLUTION_RE = re.compile(
+    r"(?=(?P<solved>that worked|fixed|solved)"
+    r"|(?P<retry>let's try|try something|different approach)"
+    r"|(?P<maybe>this might|maybe|could try))",
+    re.I,
+)
+SOLUTION_PREFIXES = {"solved": "SOLVED", "retry": "??", "maybe": "?"}
+RESOLUTION_RE = re.compile(r"that worked|fixed|solved|resolved", re.I)
+ACTION_RE = re.compile(r"edit_file|run_terminal_cmd")
+# Number of lines following a solution keyword kept as its context
+SOLUTION_CONTEXT_LINES = 2
+
+# Line numbers of errors (keyed by error text), resolutions and actions
+LineIndex = namedtuple("LineIndex", ["errors", "solutions", "actions"])
+
+def extract_error_context(lines, index, error, window=3):
     """Extract lines around an error for context."""
-    lines = context.split('\n')
+    error_indices = index.errors.get(error)
+    if not error_indices:
+        return error
+    start = max(0, error_indices[0] - window)
+    end = min(len(lines), error_indices[0] + window + 1)
+    return '\n'.join(lines[start:end])
+
+def index_lines(lines):
+    """Index the lines holding errors, resolutions and actions in a single pass."""
+    errors = {}
+    solutions = []
+    actions = []
     for i, line in enumerate(lines):
-        if error_match in line:
-            start = max(0, i - window)
-            end = min(len(lines), i + window + 1)
-            return '\n'.join(lines[start:end])
-    return error_match
+        if ERR_KEYWORDS_RE.search(line):
+            errors.setdefault(line.strip(), []).append(i)
+        if RESOLUTION_RE.search(line):
+            solutions.append(i)
+        if ACTION_RE.search(line):
+            actions.append(i)
+    return LineIndex(errors, solutions, actions)
 
-def find_solution_for_error(context, error, window=5):
+def find_solution_for_error(lines, index, error, window=5):
     """Find the solution that resolved this error."""
-    lines = context.split('\n')
-    error_indices = [i for i, line in enumerate(lines) if error in line]
-    
-    for error_idx in error_indices:
+    for error_idx in index.errors.get(error, []):
         # Look for positive responses after this error
-        for i in range(error_idx + 1, min(len(lines), error_idx + window)):
-            line = lines[i].lower()
-            if any(phrase in line for phrase in ['that worked', 'fixed', 'solved', 'resolved']):
-                # Look back for the last code change or action
-                for j in range(i-1, error_idx, -1):
-                    if 'edit_file' in lines[j] or 'run_terminal_cmd' in lines[j]:
-                        return '\n'.join(lines[j:i+1])
+        end = min(len(lines), error_idx + window)
+        for pos in range(bisect_right(index.solutions, error_idx), len(index.solutions)):
+            i = index.solutions[pos]
+            if i >= end:
+                break
+            # Look back for the last code change or action
+            action_pos = bisect_left(index.actions, i) - 1
+            if action_pos >= 0 and index.actions[action_pos] > error_idx:
+                return '\n'.join(lines[index.actions[action_pos]:i + 1])
     return None
 
 def get_conversation_context():
     """Get the full conversation context."""
     # First try to get context from environment variable
-    cursor_context = os.getenv('CURSOR_CONTEXT')
+    cursor_context = os.environ.get('CURSOR_CONTEXT')
     if cursor_context:
         return cursor_context
         
     try:
         # Try to read from stdin without blocking
-        import select
         if select.select([sys.stdin], [], [], 0.0)[0]:
             return sys.stdin.read()
-    except:
+    except (OSError, ValueError, TypeError):
+        # stdin is closed, missing (None) or not selectable on this platform
         pass
     
     # If no stdin, try to read from conversation history
     try:
-        with open('.conversation_history', 'r') as f:
-            return f.read()
-    except:
+        with open('.conversation_history', 'rb') as f:
+            return f.read().decode('utf-8', 'replace')
+    except OSError:
         pass
     
     return "No conversation context found"
 
+def get_project_structure(max_age=STRUCTURE_MAX_AGE):
+    """Get the project structure, reusing file_structure.md while it is fresh."""
+    try:
+        if time.time() - os.stat(STRUCTURE_FILE).st_mtime < max_age:
+            with open(STRUCTURE_FILE) as f:
+                # The listing is the first fenced block of the file
+                blocks = f.read().split("```")
+            if len(blocks) >= 3:
+                return blocks[1].lstrip("\n")
+    except OSError:
+        pass
+    
+    try:
+        return subprocess.run(
+            ["tree", "-L", "2", "-I", "node_modules|.git|.build|Dwell.xcodeproj"],
+            capture_output=True,
+            text=True
+        ).stdout
+    except OSError:
+        return None
+
 def summarize_session():
     # Get full context from cursor agent
     context = get_conversation_context()
     
-    # Error and Frustration Analysis
-    errors = re.findall(r"(?:error|exception|failed|failure)[^\n.]*[\n.][^\n.]*", context, re.I)
-    frustration = re.findall(r"([A-Z !]{4,}|(?:damn|shit|fuck|crap))[^\n.]*", context)
+    lines = context.split('\n')
+    index = index_lines(lines)
+    
+    # Error and Frustration Analysis, deduplicated as they are found
+    # The capitals branch also matches bare runs of spaces, which are dropped
+    points = (match.group(1).strip() for match in FRUST_RE.finditer(context))
+    frustration = list(dict.fromkeys(point for point in points if point))
     
-    # Count error occurrences
-    error_counter = Counter(errors)
-    most_common_errors = error_counter.most_common()
+    # Count error occurrences from the lines indexed for each distinct error
+    error_counter = {error: len(line_numbers) for error, line_numbers in index.errors.items()}
+    resolutions = {error: find_solution_for_error(lines, index, error) for error in error_counter}
+    # Rank errors by frequency once; ties keep first-seen order
+    ranked_errors = sorted(error_counter.items(), key=lambda item: -item[1])
+    unresolved = [(error, count) for error, count in ranked_errors if resolutions[error] is None]
     
     # Solutions and Attempts
     solutions = []
     ambiguous = []
     
     # Look for solution patterns
-    solution_patterns = [
-        (r"(?:that worked|fixed|solved)[^\n.]*(?:[\n.][^\n.]*){0,2}", "SOLVED"),
-        (r"(?:let's try|try something|different approach)[^\n.]*(?:[\n.][^\n.]*){0,2}", "??"),
-        (r"(?:this might|maybe|could try)[^\n.]*(?:[\n.][^\n.]*){0,2}", "?"),
-    ]
-    
-    for pattern, prefix in solution_patterns:
-        matches = re.findall(pattern, context, re.I)
-        for match in matches:
+    for i, line in enumerate(lines):
+        following = None
+        seen = set()
+        for match in SOLUTION_RE.finditer(line):
+            # One entry per category per line, starting at its leftmost keyword
+            if match.lastgroup in seen:
+                continue
+            seen.add(match.lastgroup)
+            if following is None:
+                following = lines[i + 1:i + 1 + SOLUTION_CONTEXT_LINES]
+            prefix = SOLUTION_PREFIXES[match.lastgroup]
+            text = '\n'.join([line[match.start():]] + following)
             if prefix in ["??", "?"]:
-                ambiguous.append((prefix, match))
+                ambiguous.append((prefix, text))
             else:
-                solutions.append(match)
+                solutions.append(text)
+    
+    session_date = datetime.datetime.now().strftime('%Y-%m-%d %H:%M')
     
     # Print summary to stdout
     print("\n=== Session Summary ===\n")
-    print(f"Session Date: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M')}\n")
+    print(f"Session Date: {session_date}\n")
     
     if solutions:
         print("\nCompleted Changes:")
@@ -107,34 +178,33 @@ def summarize_session():
         for prefix, attempt in ambiguous:
             print(f"{prefix} {attempt}")
     
-    if most_common_errors:
+    if error_counter:
         print("\nOutstanding Issues:")
-        for error, count in most_common_errors:
-            if not find_solution_for_error(context, error):
-                print(f"! {error} (occurred {count} times)")
+        for error, count in unresolved:
+            print(f"! {error} (occurred {count} times)")
     
     print("\nNext Steps:")
-    if most_common_errors:
+    if error_counter:
         print("1. Address remaining errors")
     if ambiguous:
         print("2. Follow up on attempted changes")
     print("3. Continue with planned development tasks")
     
-    # Write to files in scripts directory
-    with open(BUGFIXES_FILE, "a") as f:
-        f.write(f"\n\n## Session {datetime.datetime.now().strftime('%Y-%m-%d %H:%M')}\n")
+    # Write to files in scripts directory, building each file's body in memory first
+    with io.StringIO() as f:
+        f.write(f"\n\n## Session {session_date}\n")
         
-        if most_common_errors or frustration:
+        if error_counter or frustration:
             f.write("\n### Issues Found\n")
             
             # Document most common errors with context and solutions
-            for error, count in most_common_errors:
+            for error, count in ranked_errors:
                 f.write(f"\n#### Error (occurred {count} times):\n")
                 f.write("```\n")
-                f.write(extract_error_context(context, error))
+                f.write(extract_error_context(lines, index, error))
                 f.write("\n```\n")
                 
-                solution = find_solution_for_error(context, error)
+                solution = resolutions[error]
                 if solution:
                     f.write("\nResolution:\n```\n")
                     f.write(solution)
@@ -145,20 +215,20 @@ def summarize_session():
             # Document frustration points
             if frustration:
                 f.write("\n#### Frustration Points:\n")
-                for f in set(frustration):
-                    f.write(f"- {f[0]}\n")
+                f.writelines(f"- {point}\n" for point in frustration)
         
         if solutions or ambiguous:
             f.write("\n### Solutions and Attempts:\n")
-            for sol in solutions:
-                f.write(f"- SOLVED: {sol}\n")
-            for prefix, attempt in ambiguous:
-                f.write(f"- {prefix} {attempt}\n")
+            f.writelines(f"- SOLVED: {sol}\n" for sol in solutions)
+            f.writelines(f"- {prefix} {attempt}\n" for prefix, attempt in ambiguous)
+        
+        with open(BUGFIXES_FILE, "a") as out:
+            out.write(f.getvalue())
     
     # Create last_session_summary.md in scripts directory
-    with open(SUMMARY_FILE, "w") as f:
+    with io.StringIO() as f:
         f.write("# Last Session Summary\n\n")
-        f.write(f"Session Date: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M')}\n\n")
+        f.write(f"Session Date: {session_date}\n\n")
         
         # Get recent file changes
         try:
@@ -174,43 +244,35 @@ def summarize_session():
             pass
         
         # Get current project structure
-        try:
-            structure = subprocess.run(
-                ["tree", "-L", "2", "-I", "node_modules|.git|.build|Dwell.xcodeproj"],
-                capture_output=True,
-                text=True
-            ).stdout
-            if structure:
-                f.write("## Project Structure\n")
-                f.write("```\n" + structure + "```\n\n")
-        except:
-            pass
+        structure = get_project_structure()
+        if structure:
+            f.write("## Project Structure\n")
+            f.write("```\n" + structure + "```\n\n")
         
         # Document key changes and state
         f.write("## Session Overview\n")
         if solutions:
             f.write("\n### Completed Changes\n")
-            for sol in solutions:
-                f.write(f"- {sol}\n")
+            f.writelines(f"- {sol}\n" for sol in solutions)
         
         if ambiguous:
             f.write("\n### In Progress/Attempted Changes\n")
-            for prefix, attempt in ambiguous:
-                f.write(f"- {prefix} {attempt}\n")
+            f.writelines(f"- {prefix} {attempt}\n" for prefix, attempt in ambiguous)
         
-        if most_common_errors:
+        if error_counter:
             f.write("\n### Outstanding Issues\n")
-            for error, count in most_common_errors:
-                if not find_solution_for_error(context, error):
-                    f.write(f"- {error} (occurred {count} times)\n")
+            f.writelines(f"- {error} (occurred {count} times)\n" for error, count in unresolved)
         
         # Add continuation hints
         f.write("\n## Next Steps\n")
-        if most_common_errors:
+        if error_counter:
             f.write("1. Address remaining errors\n")
         if ambiguous:
             f.write("2. Follow up on attempted changes\n")
         f.write("3. Continue with planned development tasks\n")
+        
+        with open(SUMMARY_FILE, "w") as out:
+            out.write(f.getvalue())
 
 if __name__ == "__main__":
     summarize_session() 
@@ -1,30 +1,58 @@
 import sys
 import re
-import json
 import datetime
-import subprocess
 import os
 
 # Set up paths
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 OUTPUT_DIR = SCRIPT_DIR
 ANALYSIS_FILE = os.path.join(OUTPUT_DIR, "careful_analysis.md")
+# Only the most recent part of the conversation is analyzed
+MAX_CONTEXT_CHARS = 8 * 1024 * 1024
+
+# Patterns used to analyze the conversation
+USER_QUERY_RE = re.compile(r"<user_query>([^<]*)</user_query>")
+CODE_RE = re.compile(r"```[^`]*```")
+FILE_RE = re.compile(r"[\w-]+\.\w+")
+REQ_RE = re.compile(r"(?:must|should|need to|has to|requires)[^\n.]*", re.I)
+
+def read_context(limit=MAX_CONTEXT_CHARS):
+    """Read the conversation from stdin, keeping only its last `limit` characters."""
+    context = ""
+    while True:
+        chunk = sys.stdin.read(limit)
+        if not chunk:
+            return context
+        context = (context + chunk)[-limit:]
+
+def list_sources(root="Sources"):
+    """List a directory recursively in the same layout as `ls -R`."""
+    out = []
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        with os.scandir(directory) as it:
+            entries = sorted((e for e in it if not e.name.startswith(".")), key=lambda e: e.name)
+        out.append(f"{directory}:")
+        out.extend(e.name for e in entries)
+        out.append("")
+        # Push in reverse so subdirectories are listed in sorted order
+        stack.extend(e.path for e in reversed(entries) if e.is_dir(follow_symlinks=False))
+    return "\n".join(out)
 
 def think_carefully():
-    context = sys.stdin.read()
-    recent_messages = re.findall(r"<user_query>[^<]*</user_query>", context)
-    current_task = recent_messages[-1].replace("<user_query>", "").replace("</user_query>", "") if recent_messages else ""
-    code_snippets = re.findall(r"```[^`]*```", context)
-    file_refs = re.findall(r"[\w-]+\.[\\w]+", context)
-    requirements = re.findall(r"(?:must|should|need to|has to|requires)[^\n.]*", context, re.I)
+    context = read_context()
+    recent_messages = USER_QUERY_RE.findall(context)
+    current_task = recent_messages[-1] if recent_messages else ""
+    code_snippets = CODE_RE.findall(context)
+    file_refs = FILE_RE.findall(context)
+    requirements = REQ_RE.findall(context)
     
     # Analyze project structure
     project_structure = {}
     try:
-        result = subprocess.run(["ls", "-R", "Sources"], capture_output=True, text=True)
-        if result.returncode == 0:
-            project_structure["source_files"] = result.stdout
-    except:
+        project_structure["source_files"] = list_sources()
+    except OSError:
         pass
     
     with open(ANALYSIS_FILE, "w") as f:
@@ -1,13 +1,41 @@
 import os
-import sys
 import datetime
-import subprocess
 
 # Set up paths
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 OUTPUT_DIR = SCRIPT_DIR
 STRUCTURE_FILE = os.path.join(OUTPUT_DIR, "file_structure.md")
 
+# Listing options (hidden entries are skipped as well)
+MAX_DEPTH = 5
+EXCLUDE = frozenset({"node_modules", ".git", ".build", "Dwell.xcodeproj", ".DS_Store", "Pods"})
+EXCLUDE_SUFFIXES = (".xcodeproj", ".generated.swift")
+
+def is_excluded(name):
+    """Check whether a file or directory is left out of the listing."""
+    return name.startswith(".") or name in EXCLUDE or name.endswith(EXCLUDE_SUFFIXES)
+
+def write_tree(f, root=".", max_depth=MAX_DEPTH):
+    """Write an indented listing of the directory tree, pruning excluded directories."""
+    dir_count = 0
+    file_count = 0
+    for dirpath, dirnames, filenames in os.walk(root):
+        depth = dirpath[len(root):].count(os.sep)
+        if depth == 0:
+            f.write(f"{dirpath}\n")
+        else:
+            f.write("    " * (depth - 1) + os.path.basename(dirpath) + "/\n")
+            dir_count += 1
+        if depth >= max_depth:
+            dirnames[:] = []
+            continue
+        dirnames[:] = sorted(d for d in dirnames if not is_excluded(d))
+        for name in sorted(filenames):
+            if not is_excluded(name):
+                f.write("    " * depth + name + "\n")
+                file_count += 1
+    f.write(f"\n{dir_count} directories, {file_count} files\n")
+
 def update_file_structure():
     # Get current date and time
     now = datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
@@ -18,22 +46,12 @@ def update_file_structure():
     # Change to project root
     os.chdir(project_root)
     
-    # Run tree command
-    try:
-        structure = subprocess.run(
-            ["tree", "-L", "5", "-I", "node_modules|.git|.build|Dwell.xcodeproj|*.xcodeproj|.DS_Store|*.generated.swift|Pods"],
-            capture_output=True,
-            text=True
-        ).stdout
-    except:
-        structure = "Error: 'tree' command not found. Please install it using 'brew install tree'"
-    
     # Write to file_structure.md
     with open(STRUCTURE_FILE, "w") as f:
         f.write(f"# DwellApp Project Structure\n\n")
         f.write(f"Generated on: {now}\n\n")
         f.write("```\n")
-        f.write(structure)
+        write_tree(f)
         f.write("```\n\n")
         
         # Add section for important directories